@@ -69,22 +69,33 @@ from __future__ import division, print_function, absolute_import, unicode_litera
 # The package for accessing files in directories, etc.:
 import os
 
+# The package for copying file objects:
+import shutil
+
+# The package for parsing text using regular expressions:
+import re
+
 # Warning package in case something goes wrong
 from warnings import warn
 
 # Package for downloading online files:
 try:
-    # This package is not part of anaconda and may need to be installed.
-    import wget
+    from urllib.request import urlopen
 except ImportError:
-    warn('wget not found.  Will install with pip.')
-    import pip
-    pip.main(['install', 'wget'])
-    import wget
+    # python 2
+    from urllib2 import urlopen
 
 # The mathematical computation package:
 import numpy as np
 
+# Package that registers additional compression filters with HDF5. It must be imported before files are written / read
+try:
+    # This package is not part of anaconda and may need to be installed.
+    import hdf5plugin
+except ImportError:
+    warn('hdf5plugin not found. Data will be compressed using gzip instead of bitshuffle + LZ4')
+    hdf5plugin = None
+
 # The package used for creating and manipulating HDF5 files:
 import h5py
 
@@ -108,7 +119,11 @@ url = 'https://raw.githubusercontent.com/pycroscopy/pycroscopy/master/data/STS.a
 data_file_path = 'temp_1.asc'
 if os.path.exists(data_file_path):
     os.remove(data_file_path)
-_ = wget.download(url, data_file_path, bar=None)
+# Stream the download to the file in blocks of 1 MB:
+response = urlopen(url)
+with open(data_file_path, 'wb') as file_handle:
+    shutil.copyfileobj(response, file_handle, 1024 ** 2)
+response.close()
 
 ####################################################################################
 # 1. Exploring the Raw Data File
@@ -137,34 +152,31 @@ with open(data_file_path, 'r') as file_handle:
 # function of excitation bias) is sampled at every location on a two dimensional grid of points on the sample.
 # By knowing where the parameters are located and how the data is structured, it is possible to extract the necessary
 # information from these files.
-# Since we know that the data sizes (<200 MB) are much smaller than the physical memory of most computers, we can start
-# by safely loading the contents of the entire file to memory
+# Since the parameters are confined to the first few lines, there is no need to load the contents of the entire file
+# to memory. We only read the lines containing the parameters here and leave the data to numpy later on.
 
-# Extracting the raw data into memory
-file_handle = open(data_file_path, 'r')
-string_lines = file_handle.readlines()
-file_handle.close()
+# Extracting the header lines into memory
+with open(data_file_path, 'r') as file_handle:
+    string_lines = [file_handle.readline() for _ in range(17)]
 
 ####################################################################################
 # 3. Read the parameters
 # ======================
 # The parameters in these files are present in the first few lines of the file
 
+# Each parameter is written in a line of the form: '# key = value'
+parm_pattern = re.compile(r'^# ([^=]+?)\s*=\s*(.+?)\s*$', re.MULTILINE)
+number_pattern = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+
 # Reading parameters stored in the first few rows of the file
 parm_dict = dict()
-for line in string_lines[3:17]:
-    line = line.replace('# ', '')
-    line = line.replace('\n', '')
-    temp = line.split('=')
-    test = temp[1].strip()
-    try:
-        test = float(test)
+for key, value in parm_pattern.findall(''.join(string_lines[3:17])):
+    if number_pattern.match(value):
+        value = float(value)
         # convert those values that should be integers:
-        if test % 1 == 0:
-            test = int(test)
-    except ValueError:
-        pass
-    parm_dict[temp[0].strip()] = test
+        if value % 1 == 0:
+            value = int(value)
+    parm_dict[key] = value
 
 # Print out the parameters extracted
 for key in parm_dict.keys():
@@ -184,17 +196,15 @@ spectra_length = int(parm_dict['z-points'])
 ####################################################################################
 # 3.b Read the data
 # =================
-# Data is present after the first 403 lines of parameters.
+# Data is present after the first 403 lines of parameters. Each line contains the tab-separated spectrum from one
+# pixel. Instead of splitting and converting each line in python, we let numpy's loadtxt read the entire block in a
+# single call. Note that each line ends with a trailing tab, so we explicitly ask for the first spectra_length columns.
 
-# num_headers = len(string_lines) - num_pos
 num_headers = 403
 
 # Extract the STS data from subsequent lines
-raw_data_2d = np.zeros(shape=(num_pos, spectra_length), dtype=np.float32)
-for line_ind in range(num_pos):
-    this_line = string_lines[num_headers + line_ind]
-    string_spectrum = this_line.split('\t')[:-1]  # omitting the new line
-    raw_data_2d[line_ind] = np.array(string_spectrum, dtype=np.float32)
+raw_data_2d = np.loadtxt(data_file_path, dtype=np.float32, delimiter='\t', skiprows=num_headers,
+                         usecols=range(spectra_length), ndmin=2)
 
 ####################################################################################
 # 4.a Preparing some necessary parameters
@@ -206,10 +216,28 @@ folder_path, file_name = os.path.split(data_file_path)
 file_name = file_name[:-4] + '_'
 
 # Generate the x / voltage / spectroscopic axis:
-volt_vec = np.linspace(-1 * max_v, 1 * max_v, spectra_length)
+volt_vec = np.linspace(-1 * max_v, 1 * max_v, spectra_length, dtype=np.float32)
 
 h5_path = os.path.join(folder_path, file_name + '.h5')
 
+# HDF5 stores datasets in chunks and caches up to 1 MB worth of chunks per dataset by default. We will store complete
+# spectra from as many pixels as can fit within 1 MB in each chunk. This way, reading the spectrum at any pixel only
+# requires a single chunk and reading a single bias point across all pixels requires relatively few chunks
+rows_per_chunk = max(1, 1024 ** 2 // (spectra_length * np.float32(0).itemsize))
+
+# Neighboring bias points in each spectrum are strongly correlated, which makes the data highly compressible. The
+# bitshuffle filter with LZ4 compression (filter 32008 with options: default block size, LZ4) compresses such data
+# well while being much faster to read and write than gzip
+if hdf5plugin is not None:
+    compression, compression_opts = 32008, (0, 2)
+else:
+    compression, compression_opts = 'gzip', None
+
+# Since each chunk contains complete spectra, the spatial map at a single bias point is scattered across all the
+# chunks in the dataset. If spatial maps will be read often, the translator can additionally store a transposed copy of
+# the data, called Spatial_Maps, with complete spatial maps in each chunk by passing write_spatial_maps=True. This
+# doubles the size of the file, so we do not do so here
+
 ####################################################################################
 # 4b. Calling the NumpyTranslator to create the pycroscopy data file
 # ==================================================================
@@ -223,7 +251,9 @@ h5_path = tran.translate(h5_path, raw_data_2d, num_rows, num_cols,
                          qty_name='Current', data_unit='nA', spec_name='Bias',
                          spec_unit='V', spec_val=volt_vec, scan_height=100,
                          scan_width=200, spatial_unit='nm', data_type='STS',
-                         translator_name='ASC', parms_dict=parm_dict)
+                         translator_name='ASC', parms_dict=parm_dict,
+                         chunking=(min(rows_per_chunk, num_pos), spectra_length), compression=compression,
+                         compression_opts=compression_opts)
 
 ####################################################################################
 # Notes on pycroscopy translation
@@ -237,8 +267,18 @@ h5_path = tran.translate(h5_path, raw_data_2d, num_rows, num_cols,
 # ====================================
 # * We will only perform some simple and quick verification to show that the data has indeed been translated corectly.
 # * Please see the next notebook in the example series to learn more about reading and accessing data.
-
-with h5py.File(h5_path, mode='r') as h5_file:
+# * By default, HDF5 caches at most 1 MB of chunks per dataset, so chunks that are read more than once are decompressed
+#   again and again. Here, we open the file with a larger chunk cache (requires h5py 2.9 or newer) so that the chunks
+#   being read stay in memory. The cache only grows as chunks are read, but it can hold up to 256 MB of decompressed
+#   data per open dataset, which adds to the peak memory usage. Smaller caches are advisable on memory-constrained
+#   machines or when many datasets are open at once.
+# * The reads below span at most the 20 chunks of this small dataset, so they are read directly with h5py. Reads that
+#   span many chunks of much larger datasets can instead be wrapped with
+#   ``dask.array.from_array(h5_dset, chunks=h5_dset.chunks)`` so that the chunks are fetched and reduced by dask's
+#   scheduler a few at a time. Since h5py serializes all access to a file, including decompression, the benefit is
+#   bounded memory use rather than parallel reads
+
+with h5py.File(h5_path, mode='r', rdcc_nbytes=256 * 1024 ** 2, rdcc_nslots=1000003, rdcc_w0=0.75) as h5_file:
     # See if a tree has been created within the hdf5 file:
     px.hdf_utils.print_tree(h5_file)
 
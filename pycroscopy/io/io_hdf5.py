@@ -285,6 +285,7 @@ class ioHDF5(object):
                             itm = h5_file[parent].create_dataset(child.name,
                                                                  data=child.data,
                                                                  compression=child.compression,
+                                                                 compression_opts=child.compression_opts,
                                                                  dtype=child.data.dtype,
                                                                  chunks=child.chunking)
                         except RuntimeError:
@@ -301,6 +302,7 @@ class ioHDF5(object):
                         try:
                             itm = h5_file[parent].create_dataset(child.name, child.maxshape,
                                                                  compression=child.compression,
+                                                                 compression_opts=child.compression_opts,
                                                                  dtype=child.dtype,
                                                                  chunks=child.chunking)
                         except RuntimeError:
@@ -317,6 +319,7 @@ class ioHDF5(object):
                         itm = h5_file[parent].create_dataset(child.name,
                                                              data=child.data,
                                                              compression=child.compression,
+                                                             compression_opts=child.compression_opts,
                                                              dtype=child.data.dtype,
                                                              chunks=child.chunking,
                                                              maxshape=max_shape)
@@ -113,7 +113,7 @@ class MicroDataset(MicroData):
     """
 
     def __init__(self, name, data, dtype=None, compression=None, chunking=None, parent=None, resizable=False,
-                 maxshape=None):
+                 maxshape=None, compression_opts=None):
         """
         Parameters
         ----------
@@ -138,6 +138,9 @@ class MicroDataset(MicroData):
             Maximum size in each axis this dataset is expected to be
             if this parameter is provided, io will ONLY allocate space. 
             Make sure to specify the dtype appropriately. The provided data will be ignored
+        compression_opts : (Optional) object
+            Options for the compression filter. See h5py compression_opts. For example, the level for gzip or the
+            (block size, compressor) pair for the bitshuffle filter
             
         Examples
         --------   
@@ -171,6 +174,7 @@ class MicroDataset(MicroData):
         self.data = data
         self.dtype = dtype
         self.compression = compression
+        self.compression_opts = compression_opts
         self.chunking = _make_iterable(chunking)
         self.resizable = resizable
         self.maxshape = _make_iterable(maxshape)
@@ -0,0 +1,44 @@
+from __future__ import division, print_function, absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import h5py
+import numpy as np
+
+from pycroscopy.io.translators.numpy_translator import NumpyTranslator
+
+
+class TestNumpyTranslator(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __check_spatial_maps(self, num_rows, num_cols, spectra_length, chunking, expected_chunks):
+        main_data = np.random.RandomState(0).rand(num_rows * num_cols, spectra_length).astype(np.float32)
+        h5_path = NumpyTranslator().translate(os.path.join(self.folder, 'test.h5'), main_data, num_rows, num_cols,
+                                              qty_name='Current', data_unit='nA', chunking=chunking,
+                                              write_spatial_maps=True)
+        with h5py.File(h5_path, mode='r') as h5_file:
+            h5_chan_grp = h5_file['Measurement_000/Channel_000']
+            h5_maps = h5_chan_grp['Spatial_Maps']
+            self.assertEqual(h5_maps.chunks, expected_chunks)
+            self.assertTrue(np.array_equal(h5_maps[()], main_data.T))
+            self.assertEqual(h5_maps.attrs['units'], 'nA')
+            # Spatial_Maps is a plain copy, not an ancillary dataset of the main dataset
+            self.assertNotIn('Spatial_Maps', h5_chan_grp['Raw_Data'].attrs)
+
+    def test_spatial_maps_per_chunk(self):
+        self.__check_spatial_maps(10, 10, 500, (8, 500), (40, 100))
+
+    def test_spatial_map_split_across_chunks(self):
+        self.__check_spatial_maps(100, 100, 4, (256, 4), (1, 1024))
+
+    def test_no_spatial_maps_by_default(self):
+        h5_path = NumpyTranslator().translate(os.path.join(self.folder, 'test.h5'), np.zeros((100, 5)), 10, 10)
+        with h5py.File(h5_path, mode='r') as h5_file:
+            self.assertNotIn('Spatial_Maps', h5_file['Measurement_000/Channel_000'])
@@ -0,0 +1,76 @@
+from __future__ import division, print_function, absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import h5py
+import numpy as np
+
+from pycroscopy.io.translators.omicron_asc import AscTranslator
+
+
+def _write_asc(file_path, data, trailing_newline=True, num_missing=0, short_row=None):
+    num_rows, num_cols, spectra_length = data.shape
+    header = ['# File Format = ASCII', '# Created by test', '# Original file: test.asc',
+              '# x-pixels = {}'.format(num_cols), '# y-pixels = {}'.format(num_rows), '# x-length = 29.7595',
+              '# y-length = 29.7595', '# x-offset = -967.807', '# y-offset = -781.441',
+              '# z-points = {}'.format(spectra_length), '# z-section = 491', '# z-unit = nV', '# z-range = 2e+009',
+              '# z-offset = 1116.49', '# value-unit = nA', '# scanspeed = 5.9519e+010', '# voidpixels =0']
+    header += ['# description line {}'.format(ind) for ind in range(403 - len(header))]
+    lines = ['\t'.join('%g' % val for val in spectrum) + '\t' for spectrum in data.reshape(-1, spectra_length)]
+    lines = lines[:len(lines) - num_missing]
+    if short_row is not None:
+        lines[short_row] = lines[short_row].split('\t', 1)[1]
+    with open(file_path, 'w') as file_handle:
+        file_handle.write('\n'.join(header + lines))
+        if trailing_newline:
+            file_handle.write('\n')
+
+
+class TestAscTranslator(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data = np.random.RandomState(0).uniform(-3, 3, size=(10, 10, 500)).astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __translate(self, **kwargs):
+        file_path = os.path.join(self.folder, 'STS.asc')
+        _write_asc(file_path, self.data, **kwargs)
+        h5_path = AscTranslator().translate(file_path)
+        with h5py.File(h5_path, mode='r') as h5_file:
+            return h5_file['Measurement_000/Channel_000/Raw_Data'][()]
+
+    def test_translate(self):
+        file_path = os.path.join(self.folder, 'STS.asc')
+        _write_asc(file_path, self.data)
+        h5_path = AscTranslator().translate(file_path)
+        # Values as parsed from their text representation
+        expected = np.array(['%g' % val for val in self.data.ravel()], dtype=np.float32).reshape(-1, 500)
+        with h5py.File(h5_path, mode='r') as h5_file:
+            h5_main = h5_file['Measurement_000/Channel_000/Raw_Data']
+            self.assertEqual(h5_main.dtype, np.float32)
+            self.assertTrue(np.array_equal(h5_main[()], expected))
+            parm_dict = dict(h5_file['Measurement_000'].attrs)
+        self.assertEqual(parm_dict, {'x-pixels': 10.0, 'y-pixels': 10.0, 'x-length': 29.7595, 'y-length': 29.7595,
+                                     'x-offset': -967.807, 'y-offset': -781.441, 'z-points': 500.0,
+                                     'z-section': 491.0, 'z-unit': 'nV', 'z-range': 2E+9, 'z-offset': 1116.49,
+                                     'value-unit': 'nA', 'scanspeed': 5.9519E+10, 'voidpixels': 0.0,
+                                     'translator': 'NumpyTranslator'})
+
+    def test_no_trailing_newline(self):
+        raw_data = self.__translate(trailing_newline=False)
+        self.assertTrue(np.allclose(raw_data, self.data.reshape(-1, 500), atol=1E-5))
+
+    def test_truncated_file(self):
+        with self.assertRaises(ValueError):
+            self.__translate(num_missing=3)
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'STS.h5')))
+
+    def test_short_row(self):
+        with self.assertRaises(ValueError):
+            self.__translate(short_row=5)
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'STS.h5')))
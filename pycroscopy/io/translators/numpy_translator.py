@@ -6,6 +6,7 @@ Created on Fri Jan 27 17:58:35 2017
 """
 
 from __future__ import division, print_function, absolute_import, unicode_literals
+import h5py
 import numpy as np  # For array operations
 
 from .translator import Translator
@@ -27,7 +28,8 @@ class NumpyTranslator(Translator):
 
     def translate(self, h5_path, main_data, num_rows, num_cols, qty_name='Unknown', data_unit='a. u.',
                   spec_name='Spectroscopic_Variable', spec_val=None, spec_unit='a. u.', data_type='generic',
-                  translator_name='numpy', scan_height=None, scan_width=None, spatial_unit='m', parms_dict={}):
+                  translator_name='numpy', scan_height=None, scan_width=None, spatial_unit='m', parms_dict={},
+                  chunking=None, compression='gzip', compression_opts=None, write_spatial_maps=False):
         """
         The main function that translates the provided data into a .h5 file
 
@@ -48,6 +50,14 @@ class NumpyTranslator(Translator):
         scan_width
         spatial_unit
         parms_dict
+        chunking
+        compression
+        compression_opts
+        write_spatial_maps : Boolean (Optional. Default = False)
+            Whether or not to also write the main data arranged as [spectra x positions] into a dataset called
+            Spatial_Maps. This dataset is written block by block after the main dataset and is not linked to it as an
+            ancillary dataset. Reading the spatial map at a single spectroscopic step from this dataset touches far
+            fewer chunks than slicing a column out of the main dataset, at the cost of storing the data twice
 
         Returns
         -------
@@ -59,11 +69,60 @@ class NumpyTranslator(Translator):
 
         spectra_length = main_data.shape[1]
 
-        ds_main = MicroDataset('Raw_Data', data=main_data, dtype=np.float32, compression='gzip',
-                               chunking=calc_chunks(main_data.shape, np.float32(0).itemsize,
-                                                    unit_chunks=(1, spectra_length)))
+        if chunking is None:
+            chunking = calc_chunks(main_data.shape, np.float32(0).itemsize, unit_chunks=(1, spectra_length))
+
+        ds_main = MicroDataset('Raw_Data', data=main_data, dtype=np.float32, compression=compression,
+                               compression_opts=compression_opts, chunking=chunking)
         ds_main.attrs = {'quantity': qty_name, 'units': data_unit}
 
+        aux_dsets = self._build_ancillary_dsets(num_rows, num_cols, spectra_length, spec_name=spec_name,
+                                                spec_val=spec_val, spec_unit=spec_unit, scan_height=scan_height,
+                                                scan_width=scan_width, spatial_unit=spatial_unit)
+
+        parms_dict.update({'translator': 'NumpyTranslator'})
+
+        h5_path = super(NumpyTranslator, self).simple_write(h5_path, data_type, translator_name, ds_main, aux_dsets,
+                                                            parm_dict=parms_dict)
+
+        if write_spatial_maps:
+            self.__write_spatial_maps(h5_path, main_data, int(np.prod(chunking)), qty_name, data_unit,
+                                      compression=compression, compression_opts=compression_opts)
+
+        return h5_path
+
+    @staticmethod
+    def _build_ancillary_dsets(num_rows, num_cols, spectra_length, spec_name='Spectroscopic_Variable', spec_val=None,
+                               spec_unit='a. u.', scan_height=None, scan_width=None, spatial_unit='m'):
+        """
+        Builds the position and spectroscopic datasets for a main dataset arranged as [positions x spectra]
+
+        Parameters
+        ----------
+        num_rows : unsigned int
+            Number of rows of pixels
+        num_cols : unsigned int
+            Number of columns of pixels
+        spectra_length : unsigned int
+            Number of points in the spectroscopic axis
+        spec_name : string / unicode (Optional)
+            Name of the spectroscopic variable
+        spec_val : list or 1D numpy array (Optional)
+            Values of the spectroscopic variable. By default, the indices are used as the values
+        spec_unit : string / unicode (Optional)
+            Units of the spectroscopic variable
+        scan_height : float (Optional)
+            Height of the scan. Required along with scan_width to set the position values
+        scan_width : float (Optional)
+            Width of the scan. Required along with scan_height to set the position values
+        spatial_unit : string / unicode (Optional)
+            Units of the position values
+
+        Returns
+        -------
+        aux_dsets : list of MicroDataset objects
+            Position indices, position values, spectroscopic indices and spectroscopic values datasets
+        """
         pos_steps = None
         if scan_width is not None and scan_height is not None:
             pos_steps = [1.0 * scan_height / num_rows, 1.0 * scan_width / num_cols]
@@ -77,8 +136,49 @@ class NumpyTranslator(Translator):
             if type(spec_val) in [list, np.ndarray]:
                 ds_spec_vals.data = np.float32(np.atleast_2d(spec_val))
 
-        parms_dict.update({'translator': 'NumpyTranslator'})
+        return [ds_pos_ind, ds_pos_val, ds_spec_inds, ds_spec_vals]
 
-        return super(NumpyTranslator, self).simple_write(h5_path, data_type, translator_name, ds_main,
-                                                         [ds_pos_ind, ds_pos_val, ds_spec_inds, ds_spec_vals],
-                                                         parm_dict=parms_dict)
+    @staticmethod
+    def __write_spatial_maps(h5_path, main_data, chunk_size, qty_name, data_unit, compression=None,
+                             compression_opts=None):
+        """
+        Writes the main data arranged as [spectra x positions] into a dataset called Spatial_Maps next to the main
+        dataset. This dataset is a plain copy of the data and is not linked to the main dataset as an ancillary dataset
+
+        Parameters
+        ----------
+        h5_path : string / unicode
+            Absolute path of the h5 file written by simple_write
+        main_data : 2D numpy array
+            Main data arranged as [positions x spectra]
+        chunk_size : unsigned int
+            Number of elements in each chunk of the main dataset. Chunks of Spatial_Maps are no larger than this
+        qty_name : string / unicode
+            Physical quantity of the data
+        data_unit : string / unicode
+            Units of the data
+        compression : (Optional) string / unsigned int
+            Compression filter for the dataset
+        compression_opts : (Optional) object
+            Options for the compression filter
+        """
+        num_pos, spectra_length = main_data.shape
+
+        # Each chunk holds as many complete spatial maps as fit within the size of a chunk of the main dataset.
+        # Spatial maps that are larger than that are split across chunks
+        maps_per_chunk = int(min(max(1, chunk_size // num_pos), spectra_length))
+        pos_per_chunk = int(min(num_pos, chunk_size))
+
+        with h5py.File(h5_path, mode='r+') as h5_file:
+            h5_chan_grp = h5_file['Measurement_000/Channel_000']
+            h5_maps = h5_chan_grp.create_dataset('Spatial_Maps', shape=(spectra_length, num_pos), dtype=np.float32,
+                                                 chunks=(maps_per_chunk, pos_per_chunk), compression=compression,
+                                                 compression_opts=compression_opts)
+            h5_maps.attrs['quantity'] = qty_name
+            h5_maps.attrs['units'] = data_unit
+
+            # Only one row of chunks is transposed in memory at a time
+            for start_ind in range(0, spectra_length, maps_per_chunk):
+                end_ind = min(start_ind + maps_per_chunk, spectra_length)
+                h5_maps[start_ind:end_ind] = np.ascontiguousarray(main_data[:, start_ind:end_ind].T,
+                                                                  dtype=np.float32)
@@ -6,9 +6,19 @@ Created on Wed Sep 28 12:50:47 2016
 """
 
 from __future__ import division, print_function, absolute_import, unicode_literals
+import mmap
+import re
+from contextlib import closing
+import h5py
 import numpy as np  # For array operations
-from os import path
+from os import path, remove
 from .numpy_translator import NumpyTranslator
+from ..hdf_utils import calc_chunks
+from ..microdata import MicroDataset  # building blocks for defining hierarchical storage in the H5 file
+
+# Header lines are of the form: '# key = value'
+_parm_pattern = re.compile(br'^# ([^=]+?)\s*=\s*(.+?)\s*$', re.MULTILINE)
+_number_pattern = re.compile(br'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
 
 
 class AscTranslator(NumpyTranslator):
@@ -38,79 +48,97 @@ class AscTranslator(NumpyTranslator):
         folder_path, file_name = path.split(file_path)
         file_name = file_name[:-4]
 
-        # Extracting the raw data into memory
-        file_handle = open(file_path, 'r')
-        string_lines = file_handle.readlines()
-        file_handle.close()
+        # Map the file into memory instead of reading every line into a python string
+        with open(file_path, 'rb') as file_handle:
+            file_map = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # The memory map is released even if the file turns out to be malformed
+        with closing(file_map):
+            # Extract parameters from the first few header lines. Only these lines are scanned, not the entire file
+            parm_dict = self.__read_parms(file_map[_skip_lines(file_map, 0, 3): _skip_lines(file_map, 0, 17)])
+
+            num_rows = int(parm_dict['y-pixels'])
+            num_cols = int(parm_dict['x-pixels'])
+            num_pos = num_rows * num_cols
+            spectra_length = int(parm_dict['z-points'])
+
+            num_headers = 403
 
-        # Extract parameters from the first few header lines
-        parm_dict = self.__read_parms(string_lines)
+            # Generate the x / voltage / spectroscopic axis:
+            volt_vec = np.linspace(-1 * max_v, 1 * max_v, spectra_length, dtype=np.float32)
 
-        num_rows = int(parm_dict['y-pixels'])
-        num_cols = int(parm_dict['x-pixels'])
-        num_pos = num_rows * num_cols
-        spectra_length = int(parm_dict['z-points'])
+            h5_path = path.join(folder_path, file_name + '.h5')
 
-        # num_headers = len(string_lines) - num_pos
-        num_headers = 403
+            # Only allocate space for the main dataset. The data is read and written one block of chunks at a time
+            # below. Each chunk holds complete spectra
+            ds_chunking = calc_chunks([num_pos, spectra_length], np.float32(0).itemsize,
+                                      unit_chunks=(1, spectra_length))
+            ds_main = MicroDataset('Raw_Data', data=[], maxshape=(num_pos, spectra_length), dtype=np.float32,
+                                   chunking=ds_chunking, compression='gzip')
+            ds_main.attrs = {'quantity': 'Current', 'units': 'nA'}
 
-        # Extract the STS data from subsequent lines
-        raw_data_2d = self._read_data(string_lines, num_pos, spectra_length, num_headers)
+            aux_dsets = self._build_ancillary_dsets(num_rows, num_cols, spectra_length, spec_name='Bias',
+                                                    spec_val=volt_vec, spec_unit='V', scan_height=100, scan_width=200,
+                                                    spatial_unit='nm')
 
-        # Generate the x / voltage / spectroscopic axis:
-        volt_vec = np.linspace(-1 * max_v, 1 * max_v, spectra_length)
+            # Same value as when the data was written through NumpyTranslator.translate
+            parm_dict.update({'translator': 'NumpyTranslator'})
 
-        h5_path = path.join(folder_path, file_name + '.h5')
+            h5_path = self.simple_write(h5_path, 'STS', 'ASC', ds_main, aux_dsets, parm_dict=parm_dict)
 
-        # pass on the the necessary pieces of information onto the numpy translate that will handle the creation and
-        # writing to the h5 file.
-        h5_path = super(AscTranslator, self).translate(h5_path, raw_data_2d, num_rows, num_cols, qty_name='Current',
-                                                       data_unit='nA', spec_name='Bias', spec_unit='V',
-                                                       spec_val=volt_vec, scan_height=100, scan_width=200,
-                                                       spatial_unit='nm', data_type='STS', translator_name='ASC',
-                                                       parms_dict=parm_dict)
+            # Extract the STS data from subsequent lines straight into the main dataset
+            try:
+                with h5py.File(h5_path, mode='r+') as h5_file:
+                    self._read_data(file_map, h5_file['Measurement_000/Channel_000/Raw_Data'], num_headers)
+            except:
+                # Do not leave behind a file with a partially populated main dataset
+                remove(h5_path)
+                raise
 
         return h5_path
 
-    def _read_data(self, string_lines, num_pos, spectra_length, num_headers):
+    def _read_data(self, file_map, h5_main, num_headers):
         """
-        Reads the data from lines of the data file
+        Reads the data from lines of the data file and populates the main dataset
 
         Parameters
         ----------
-        string_lines : list of strings
-            Lines containing the data in string format, separated by tabs
-        num_pos : unsigned int
-            Number of pixels
-        spectra_length : unsigned int
-            Number of points in the spectral / voltage axis
+        file_map : mmap.mmap
+            Memory map of the data file. Data values are in text format, separated by tabs
+        h5_main : h5py.Dataset
+            Main dataset arranged as [position x voltage points] that will be populated
         num_headers : unsigned int
             Number of header lines to ignore
-
-        Returns
-        -------
-        raw_data_2d : 2D numpy array
-            Data arranged as [position x voltage points]
         """
-        raw_data_2d = np.zeros(shape=(num_pos, spectra_length), dtype=np.float32)
-        for line_ind in range(num_pos):
-            this_line = string_lines[num_headers + line_ind]
-            string_spectrum = this_line.split('\t')[:-1]  # omitting the new line
-            raw_data_2d[line_ind] = np.array(string_spectrum, dtype=np.float32)
-        return raw_data_2d
+        num_pos, spectra_length = h5_main.shape
+        # Several chunks worth of rows, amounting to about 1 MB of data, are parsed at a time
+        rows_per_chunk = h5_main.chunks[0]
+        chunk_bytes = rows_per_chunk * spectra_length * h5_main.dtype.itemsize
+        rows_per_block = rows_per_chunk * max(1, 1024 ** 2 // chunk_bytes)
+
+        # Byte offset of the line after the headers. The end of each block is found as the blocks are read
+        data_offset = _skip_lines(file_map, 0, num_headers)
+
+        # Only one block of rows that lines up with the chunks of the dataset is held in memory at any time
+        for start_row in range(0, num_pos, rows_per_block):
+            end_row = min(start_row + rows_per_block, num_pos)
+            block_end = _skip_lines(file_map, data_offset, end_row - start_row)
+            h5_main[start_row:end_row] = _parse_block(file_map[data_offset: block_end], end_row - start_row,
+                                                      spectra_length)
+            data_offset = block_end
 
     def _parse_file_path(self, input_path):
         pass
 
     @staticmethod
-    def __read_parms(string_lines):
+    def __read_parms(header_bytes):
         """
         Returns the parameters regarding the experiment as dictionary
 
         Parameters
         ----------
-        string_lines : list of strings
-            Lines from the data file in string representation
+        header_bytes : bytes
+            Header lines from the data file that contain the parameters
 
         Returns
         -------
@@ -119,15 +147,67 @@ class AscTranslator(NumpyTranslator):
         """
         # Reading parameters stored in the first few rows of the file
         parm_dict = dict()
-        for line in string_lines[3:17]:
-            line = line.replace('# ', '')
-            line = line.replace('\n', '')
-            temp = line.split('=')
-            test = temp[1].strip()
-            try:
-                test = float(test)
-            except ValueError:
-                pass
-            parm_dict[temp[0].strip()] = test
+        for key, value in _parm_pattern.findall(header_bytes):
+            if _number_pattern.match(value):
+                value = float(value)
+            else:
+                value = value.decode()
+            parm_dict[key.decode()] = value
 
         return parm_dict
+
+
+def _skip_lines(file_map, offset, num_lines):
+    """
+    Finds the byte offset of the line that is a given number of lines after the provided offset
+
+    Parameters
+    ----------
+    file_map : mmap.mmap
+        Memory map of the data file
+    offset : unsigned int
+        Byte offset of the start of a line in the data file
+    num_lines : unsigned int
+        Number of lines to skip
+
+    Returns
+    -------
+    offset : unsigned int
+        Byte offset of the start of the line after the skipped lines
+    """
+    for line_ind in range(num_lines):
+        line_end = file_map.find(b'\n', offset)
+        if line_end < 0:
+            # The last line of the file need not end with a new line character
+            if line_ind == num_lines - 1 and offset < len(file_map):
+                return len(file_map)
+            raise ValueError('Data file ended before the expected number of lines')
+        offset = line_end + 1
+    return offset
+
+
+def _parse_block(data_block, num_rows, spectra_length):
+    """
+    Parses a block of lines of STS data
+
+    Parameters
+    ----------
+    data_block : bytes
+        Lines of the data file, each containing the spectrum from one pixel with values separated by tabs
+    num_rows : unsigned int
+        Number of lines in the block
+    spectra_length : unsigned int
+        Number of points in the spectral / voltage axis
+
+    Returns
+    -------
+    raw_data_2d : 2D numpy array
+        Data arranged as [position x voltage points]
+    """
+    # Tabs, trailing tabs and new lines are all whitespace, so the entire block can be tokenized in one pass
+    raw_data_1d = np.fromstring(data_block, dtype=np.float32, sep=' ')
+    # Since row boundaries are not seen by the tokenizer, a short or long row only shows up in the total count
+    if raw_data_1d.size != num_rows * spectra_length:
+        raise ValueError('Expected {} values in {} rows of STS data but found {}'.format(num_rows * spectra_length,
+                                                                                        num_rows, raw_data_1d.size))
+    return raw_data_1d.reshape(num_rows, spectra_length)
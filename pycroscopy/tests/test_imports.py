@@ -0,0 +1,27 @@
+from __future__ import division, print_function, absolute_import, unicode_literals
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class TestImports(TestCase):
+    """
+    Each access path is checked in a fresh interpreter since the import order of the submodules matters
+    """
+
+    def __check(self, statement):
+        proc = subprocess.Popen([sys.executable, '-c', statement], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, stderr = proc.communicate()
+        self.assertEqual(proc.returncode, 0, msg=stderr.decode('utf-8', 'replace'))
+
+    def test_package_attributes(self):
+        for name in ['hdf_utils', 'ioHDF5', 'MicroDataGroup', 'NumpyTranslator', 'plot_utils', 'viz', 'io',
+                     'analysis', 'processing']:
+            self.__check('import pycroscopy as px; px.{}'.format(name))
+
+    def test_submodule_imports(self):
+        for name in ['io', 'processing', 'analysis', 'viz']:
+            self.__check('import pycroscopy.{}'.format(name))
+
+    def test_star_import(self):
+        self.__check('from pycroscopy import *; hdf_utils; MicroDataset; plot_utils')